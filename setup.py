@@ -40,6 +40,7 @@ setuptools.setup(
         "flagparse>=0.0.2",
         "humanize>=0.5.1",
         "numpy>=1.16.3",
+        "orjson>=3.4.0",
         "pid>=2.2.3",
         "pyyaml>=5.1.1",
         "semver>=2.8.1",
@@ -1,5 +1,8 @@
+import functools
 import io
-import json
+import numpy
+import orjson
+import tempfile
 
 from aiohttp import web
 from typing import Union
@@ -11,6 +14,18 @@ from tensorcraft.backend.httpapi import routing
 
 _ConflictReason = Union[errors.DuplicateError, errors.LatestTagError]
 
+# Size of the chunk read from the request body at once.
+_CHUNK_SIZE = 1 << 20
+
+# Uploads below this size are kept in memory, larger ones spill to disk.
+_SPOOL_MAX_SIZE = 8 << 20
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Serialize arrays directly, without converting each element into the
+# Python object.
+_dumps = functools.partial(orjson.dumps, option=orjson.OPT_SERIALIZE_NUMPY)
+
 
 def make_error_response(exc_class, model_exc=errors.ModelError, text=""):
     """Return an exception with a specific error code.
@@ -37,14 +52,39 @@ def make_not_found_response(reason: errors.NotFoundError) -> web.HTTPException:
     return make_error_response(web.HTTPNotFound, reason, str(reason))
 
 
+async def read_array(req: web.Request) -> numpy.ndarray:
+    """Read the binary request body as an array.
+
+    The shape of the array is passed in the "Input-Shape" header as a
+    comma-separated list of dimensions, and the type of array elements
+    is passed in the "Input-Dtype" header (e.g. "float32"). The array is
+    converted to the data type of the model on prediction.
+    """
+    shape = req.headers.get("Input-Shape")
+    if not shape:
+        raise ValueError("Input-Shape header is required for binary input")
+
+    dtype = req.headers.get("Input-Dtype")
+    if not dtype:
+        raise ValueError("Input-Dtype header is required for binary input")
+
+    try:
+        dtype = numpy.dtype(dtype)
+    except TypeError:
+        raise ValueError(f"Input-Dtype {dtype} is not a valid data type")
+
+    shape = tuple(int(dim) for dim in shape.split(","))
+    return numpy.frombuffer(await req.read(), dtype=dtype).reshape(shape)
+
+
 class ModelView:
     """View to handle actions related to models.
 
     Attributes:
-        models -- container of models
+        models -- cache of models, used to batch predictions
     """
 
-    def __init__(self, models: model.AbstractStorage) -> None:
+    def __init__(self, models: model.Cache) -> None:
         self.models = models
 
     @routing.urlto("/models/{name}/{tag}")
@@ -60,11 +100,17 @@ class ModelView:
         if not req.can_read_body:
             raise make_bad_request_response(text="request has no body")
 
-        try:
-            model_stream = io.BytesIO(await req.read())
-            await self.models.save(name, tag, model_stream)
-        except errors.ModelError as e:
-            raise make_conflict_response(reason=e)
+        # Spool the archive chunk by chunk instead of reading the whole
+        # body into memory, since model archives could be quite large.
+        with tempfile.SpooledTemporaryFile(_SPOOL_MAX_SIZE) as model_stream:
+            async for chunk in req.content.iter_chunked(_CHUNK_SIZE):
+                model_stream.write(chunk)
+            model_stream.seek(0)
+
+            try:
+                await self.models.save(name, tag, model_stream)
+            except errors.ModelError as e:
+                raise make_conflict_response(reason=e)
 
         return web.Response(status=web.HTTPCreated.status_code)
 
@@ -84,28 +130,51 @@ class ModelView:
             raise make_bad_request_response(text="request has no body")
 
         try:
-            body = await req.json()
             model = await self.models.load(name, tag)
 
-            predictions = model.predict(x=body["x"])
-        except (errors.InputShapeError, json.decoder.JSONDecodeError) as e:
+            if req.content_type == "application/octet-stream":
+                x = await read_array(req)
+            else:
+                body = await req.json()
+                x = body["x"]
+
+            predictions = await self.models.predict(model, x)
+        except (errors.InputShapeError, ValueError) as e:
             raise make_bad_request_response(text=str(e))
         except errors.NotFoundError as e:
             raise make_not_found_response(reason=e)
 
-        return web.json_response(dict(y=predictions))
+        if req.headers.get("Accept") == "application/octet-stream":
+            return web.Response(
+                body=predictions.tobytes(),
+                content_type="application/octet-stream",
+                headers={"Output-Shape": ",".join(map(str, predictions.shape)),
+                         "Output-Dtype": predictions.dtype.name})
+
+        return web.Response(body=_dumps(dict(y=predictions)),
+                            headers=_JSON_HEADERS)
 
     @routing.urlto("/models")
-    async def list(self, req: web.Request) -> web.Response:
+    async def list(self, req: web.Request) -> web.StreamResponse:
         """HTTP handler to list available models.
 
-        List available models in the storage.
+        List available models in the storage. Models are written to the
+        response one by one, so the whole list is never kept in memory.
 
         Args:
             req -- empty request
         """
-        models = [m.to_dict() async for m in self.models.all()]
-        return web.json_response(list(models))
+        resp = web.StreamResponse(headers=_JSON_HEADERS)
+        await resp.prepare(req)
+
+        separator = b"["
+        async for m in self.models.all():
+            await resp.write(separator + _dumps(m.to_dict()))
+            separator = b","
+
+        await resp.write(b"[]" if separator == b"[" else b"]")
+        await resp.write_eof()
+        return resp
 
     @routing.urlto("/models/{name}/{tag}")
     async def delete(self, req: web.Request) -> web.Response:
@@ -1,12 +1,14 @@
-import aiorwlock
+import asyncio
+import collections
+import concurrent.futures
 import enum
 import contextlib
-import copy
 import io
 import logging
 import numpy
 import pathlib
 import tensorflow as tf
+import threading
 import uuid
 
 from abc import ABCMeta, abstractmethod
@@ -63,12 +65,35 @@ class Loader:
         self.logger = logger
         self.strategy = strategy_class()
 
+        # Strategy scope is bound to the thread, therefore models are loaded
+        # within the threads of the loader, each thread enters the scope
+        # only once and never exits it.
+        self.executor = concurrent.futures.ThreadPoolExecutor()
+        self.local = threading.local()
+
+    def close(self) -> None:
+        """Stop the loading threads.
+
+        The scopes entered by the threads are not exited explicitly, they
+        are dropped together with the thread-local state of the stopped
+        threads.
+        """
+        self.executor.shutdown()
+
+    def enter_scope(self) -> None:
+        if getattr(self.local, "scope", None) is None:
+            self.local.scope = self.strategy.scope()
+            self.local.scope.__enter__()
+
+    def load_in_scope(self, path: Union[str, pathlib.Path]):
+        self.enter_scope()
+        m = tf.keras.experimental.load_from_saved_model(str(path))
+        self.logger.debug("Model loaded from path %s", path)
+        return m
+
     def load(self, path: Union[str, pathlib.Path]):
         """Load the model by the given path."""
-        with self.strategy.scope():
-            m = tf.keras.experimental.load_from_saved_model(str(path))
-            self.logger.debug("Model loaded from path %s", path)
-            return m
+        return self.executor.submit(self.load_in_scope, path).result()
 
 
 class Model:
@@ -82,6 +107,16 @@ class Model:
         loader -- the model loader
     """
 
+    __slots__ = ["_id", "_dict", "name", "_tag", "created_at", "loader",
+                 "path", "model", "_input_dtype", "_expected_dims",
+                 "__weakref__"]
+
+    # Slots copied to the model copy, weak references are never copied.
+    _COPY_SLOTS = tuple(slot for slot in __slots__ if slot != "__weakref__")
+
+    # Maximum number of rows fed into the model with a single call.
+    max_call_size = 256
+
     @classmethod
     def from_dict(cls, **kwargs):
         return cls(**kwargs)
@@ -98,25 +133,62 @@ class Model:
                    path=model_path, loader=loader)
 
     def to_dict(self):
-        return dict(id=self.id.hex,
-                    name=self.name,
-                    tag=self.tag,
-                    created_at=self.created_at)
+        """Return dictionary representation of the model.
+
+        The dictionary is computed once and reused until the identifier or
+        the tag of the model change (other fields are never changed after
+        the construction), therefore it must not be modified by the caller.
+        """
+        if self._dict is None:
+            self._dict = dict(id=self._id.hex,
+                              name=self.name,
+                              tag=self.tag,
+                              created_at=self.created_at)
+        return self._dict
 
     def __init__(self, uid: Union[uuid.UUID, str],
                  name: str, tag: str, created_at: float,
                  path: str = None, loader: Loader = None):
-        self.id = uuid.UUID(str(uid))
+        self.id = uid
         self.name = name
-        self.tag = tag
+        self._tag = tag
         self.created_at = created_at
 
         self.loader = loader
         self.path = path
         self.model = None
 
+        self._input_dtype = None
+        self._expected_dims = None
+
+    @property
+    def id(self) -> uuid.UUID:
+        return self._id
+
+    @id.setter
+    def id(self, uid: Union[uuid.UUID, str]) -> None:
+        # Parse the identifier only when it is not an UUID already.
+        self._id = uid if isinstance(uid, uuid.UUID) else uuid.UUID(uid)
+        self._dict = None
+
+    @property
+    def tag(self) -> str:
+        return self._tag
+
+    @tag.setter
+    def tag(self, tag: str) -> None:
+        self._tag = tag
+        self._dict = None
+
     def copy(self):
-        return copy.copy(self)
+        cls = type(self)
+        m = cls.__new__(cls)
+
+        # Assign slots directly, the copy has the same fields, therefore
+        # the dictionary representation is shared as well.
+        for slot in self._COPY_SLOTS:
+            setattr(m, slot, getattr(self, slot))
+        return m
 
     @property
     def key(self):
@@ -127,30 +199,66 @@ class Model:
         """True when the model is loaded and False otherwise."""
         return self.model is not None
 
+    @property
+    def nbytes(self) -> int:
+        """Approximate size of the loaded model weights in bytes."""
+        if not self.loaded:
+            return 0
+        return sum(w.shape.num_elements() * w.dtype.size
+                   for w in self.model.weights)
+
     def load(self):
         """Load the execution model."""
-        self.model = self.loader.load(self.path)
-        return self
+        model = self.loader.load(self.path)
 
-    def predict(self, x):
-        if not self.model:
-            raise errors.NotLoadedError(self.name, self.tag)
-
-        x = numpy.array(x)
+        # Resolve the input parameters of the model once, so they are not
+        # introspected on each prediction.
+        inputs = getattr(model, "inputs", None)
+        if inputs:
+            self._input_dtype = tf.as_dtype(inputs[0].dtype).as_numpy_dtype
+        else:
+            self._input_dtype = numpy.float32
 
         # This check make sense only for models with defined input shapes
         # (for example, when the layer is Dense).
-        if hasattr(self.model, "input_shape"):
-            # Calculate the shape of the input data and validate it with the
-            # model parameters. This exception is handled by the server in
-            # order to return an appropriate error to the client.
-            _, *expected_dims = self.model.input_shape
-            _, *actual_dims = x.shape
+        if hasattr(model, "input_shape"):
+            self._expected_dims = tuple(model.input_shape[1:])
+
+        self.model = model
+        return self
+
+    def prepare(self, x) -> numpy.ndarray:
+        """Convert the input into the array suitable for the model."""
+        # Convert the input to the model data type and C-contiguous layout
+        # at once, so TensorFlow does not copy it once again. An array of a
+        # suitable type and layout is not copied at all.
+        x = numpy.asarray(x, dtype=self._input_dtype, order="C")
+
+        # Validate the shape of the input data with the model parameters
+        # resolved on load. This exception is handled by the server in
+        # order to return an appropriate error to the client.
+        if x.ndim == 0:
+            raise ValueError("Input must be a batch of feature vectors, "
+                             "while a scalar is given.")
+
+        actual_dims = x.shape[1:]
+        if self._expected_dims not in (None, actual_dims):
+            raise errors.InputShapeError(self._expected_dims, actual_dims)
+
+        return x
 
-            if expected_dims != actual_dims:
-                raise errors.InputShapeError(expected_dims, actual_dims)
+    def predict(self, x):
+        if self.model is None:
+            raise errors.NotLoadedError(self.name, self.tag)
+
+        x = self.prepare(x)
 
-        return self.model.predict(x).tolist()
+        # Calling the model directly avoids the data pipeline created on
+        # each "predict" call, which overhead dominates for small inputs.
+        # Large inputs are still split into batches by "predict".
+        if len(x) <= self.max_call_size:
+            return numpy.asarray(self.model(x, training=False))
+        return self.model.predict(x)
 
     def __str__(self):
         return "{0}:{1}".format(self.name, self.tag)
@@ -215,6 +323,7 @@ class AbstractStorage(metaclass=ABCMeta):
         Args:
             name (str): Model name.
             tag (str): Model tag.
+            stream (io.IOBase): Readable file-like object with TAR archive.
 
         Returns:
             Saved instance of :class:`Model`.
@@ -260,6 +369,143 @@ class AbstractStorage(metaclass=ABCMeta):
         """
 
 
+class Batcher:
+    """Batcher coalesces concurrent predictions into a single model call.
+
+    Each model has a queue of pending predictions, which is drained by the
+    background task. Inputs of the pending predictions are concatenated and
+    fed into the model at once, then the result is split back.
+
+    Attributes:
+        max_batch_size -- maximum number of rows in a single batch
+        max_wait -- time in seconds to wait for more predictions
+    """
+
+    def __init__(self, max_batch_size: int = 32, max_wait: float = 0,
+                 idle_timeout: float = 60,
+                 logger: logging.Logger = internal_logger):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.idle_timeout = idle_timeout
+        self.logger = logger
+        self.queues = {}
+        self.workers = {}
+
+    async def close(self) -> None:
+        """Stop all background tasks."""
+        workers = list(self.workers.values())
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+        self.queues.clear()
+        self.workers.clear()
+
+    async def predict(self, m: Model, x) -> numpy.ndarray:
+        """Schedule the prediction and wait for its result."""
+        if not m.loaded:
+            raise errors.NotLoadedError(m.name, m.tag)
+
+        # Validate the input before putting it into the batch, so the
+        # malformed input does not fail predictions of others.
+        x = m.prepare(x)
+
+        queue = self.queues.get(m.key)
+        if queue is None:
+            queue = self.queues[m.key] = asyncio.Queue()
+            worker = asyncio.ensure_future(self.work(m.key, queue))
+            self.workers[m.key] = worker
+
+        future = asyncio.get_event_loop().create_future()
+        await queue.put((m, x, future))
+        return await future
+
+    async def get_batch(self, queue: asyncio.Queue):
+        loop = asyncio.get_event_loop()
+
+        batch = [await asyncio.wait_for(queue.get(), self.idle_timeout)]
+        deadline = loop.time() + self.max_wait
+        rows = len(batch[0][1])
+
+        while rows < self.max_batch_size:
+            try:
+                timeout = deadline - loop.time()
+                if timeout > 0:
+                    item = await asyncio.wait_for(queue.get(), timeout)
+                else:
+                    item = queue.get_nowait()
+            except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                break
+
+            batch.append(item)
+            rows += len(item[1])
+
+        return batch
+
+    async def work(self, key, queue: asyncio.Queue) -> None:
+        while True:
+            try:
+                batch = await self.get_batch(queue)
+            except asyncio.TimeoutError:
+                # Stop the idle worker, so workers and queues are not kept
+                # for every model that has ever served a prediction.
+                if queue.empty():
+                    del self.queues[key]
+                    del self.workers[key]
+                    return
+                continue
+
+            # The batch is released right after the prediction, so the
+            # waiting worker does not keep the models from being unloaded.
+            try:
+                await self.run(batch)
+            except asyncio.CancelledError:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.cancel()
+                raise
+            finally:
+                del batch
+
+    async def run(self, batch) -> None:
+        groups = collections.defaultdict(list)
+
+        # The model could be reloaded while predictions are pending, and
+        # inputs of unknown shape could differ, so batch them separately.
+        for m, x, future in batch:
+            groups[(id(m), x.shape[1:])].append((m, x, future))
+
+        for group in groups.values():
+            await self.run_group(group)
+
+    async def run_group(self, group) -> None:
+        loop = asyncio.get_event_loop()
+
+        m, *_ = group[0]
+        futures = [future for _, _, future in group]
+        inputs = [x for _, x, _ in group]
+
+        try:
+            x = numpy.concatenate(inputs)
+            y = await loop.run_in_executor(None, m.predict, x)
+
+            sections = numpy.cumsum([len(x) for x in inputs])
+            results = numpy.split(y, sections[:-1])
+        except asyncio.CancelledError:
+            # On Python 3.7 and below cancellation is an ordinary exception,
+            # it must stop the worker instead of failing the predictions.
+            raise
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for future, result in zip(futures, results):
+            if not future.done():
+                future.set_result(result)
+
+
 class Cache:
     """Cache of models used to speeds up models loading time.
 
@@ -271,12 +517,33 @@ class Cache:
     async def new(cls,
                   storage: AbstractStorage,
                   preload: bool = False,
+                  shards: int = 32,
+                  max_bytes: int = None,
+                  max_batch_size: int = 32,
                   logger: logging.Logger = internal_logger):
         self = cls()
         self.logger = logger
         self.storage = storage
-        self.lock = aiorwlock.RWLock()
         self.models = {}
+        self.batcher = Batcher(max_batch_size=max_batch_size, logger=logger)
+
+        # Loaded execution models in the order of their usage. Each of them
+        # could be shared by multiple keys (e.g. "latest" tag), so the size
+        # of execution model is accounted only once. When the total size
+        # exceeds the limit, least recently used models are unloaded, while
+        # their metadata is preserved.
+        self.loaded_models = collections.OrderedDict()
+        self.loaded_sizes = {}
+        self.loaded_bytes = 0
+        self.max_bytes = max_bytes
+
+        # Modifications of models are guarded by a set of locks, so loading
+        # of one model does not block models located in different shards.
+        #
+        # Readers do not acquire locks at all: the dictionary is modified
+        # only within the event loop without interleaving awaits, therefore
+        # readers never observe a partial state.
+        self.locks = [asyncio.Lock() for _ in range(shards)]
 
         self.storage.on_save.append(self.save_to_cache)
         self.storage.on_delete.append(self.delete_from_cache)
@@ -290,21 +557,29 @@ class Cache:
 
         return self
 
+    async def close(self) -> None:
+        """Stop batching of predictions."""
+        await self.batcher.close()
+
     @property
     def root_path(self) -> pathlib.Path:
         return self.storage.root_path
 
+    def lock_for(self, name: str, tag: str) -> asyncio.Lock:
+        """Return the lock of the shard the model belongs to."""
+        return self.locks[hash((name, tag)) % len(self.locks)]
+
     async def all(self) -> Sequence[Model]:
         """List all available models.
 
         The call puts all retrieved models into the cache. All that models are
         not loaded. So before using them, they must be loaded.
+
+        Models already present in the cache are returned instead of the
+        retrieved ones, so their memoized representation is reused.
         """
-        async with self.lock.reader_lock:
-            async for m in self.storage.all():
-                if m.key not in self.models:
-                    self.models[m.key] = m
-                yield m
+        async for m in self.storage.all():
+            yield self.models.setdefault(m.key, m)
 
     async def save(self, name: str, tag: str, model: io.IOBase) -> Model:
         """Save the model and load it into the memory.
@@ -317,8 +592,8 @@ class Cache:
         return m
 
     async def save_to_cache(self, m: Model) -> None:
-        async with self.lock.writer_lock:
-            self.models[(m.name, m.tag)] = m
+        async with self.lock_for(m.name, m.tag):
+            self.put(m)
 
     async def delete(self, name: str, tag: str) -> None:
         # This is totally fine to loose the data from the cache but
@@ -327,23 +602,104 @@ class Cache:
         await self.storage.delete(name, tag)
 
     async def delete_from_cache(self, name: str, tag: str) -> None:
-        async with self.lock.writer_lock:
+        async with self.lock_for(name, tag):
             key = (name, tag)
+            self.forget(key)
             if key in self.models:
                 del self.models[key]
 
+    def put(self, m: Model) -> None:
+        """Put the model into the cache and evict least recently used."""
+        self.forget(m.key)
+        self.models[m.key] = m
+
+        if m.loaded:
+            uid = id(m.model)
+            keys = self.loaded_models.get(uid)
+
+            if keys is None:
+                keys = self.loaded_models[uid] = set()
+                self.loaded_sizes[uid] = m.nbytes
+                self.loaded_bytes += self.loaded_sizes[uid]
+            else:
+                self.loaded_models.move_to_end(uid)
+
+            keys.add(m.key)
+            self.evict()
+
+    def forget(self, key) -> None:
+        """Stop tracking the loaded model under the given key.
+
+        The size of the execution model is released, when the model is not
+        referenced by other keys.
+        """
+        m = self.models.get(key)
+        if m is None or not m.loaded:
+            return
+
+        uid = id(m.model)
+        keys = self.loaded_models.get(uid)
+        if keys is None:
+            return
+
+        keys.discard(key)
+        if not keys:
+            del self.loaded_models[uid]
+            self.loaded_bytes -= self.loaded_sizes.pop(uid)
+
+    def evict(self) -> None:
+        """Unload least recently used models to fit into the size limit.
+
+        The most recently used model is never evicted.
+        """
+        if self.max_bytes is None:
+            return
+
+        while (self.loaded_bytes > self.max_bytes and
+               len(self.loaded_models) > 1):
+            uid, keys = self.loaded_models.popitem(last=False)
+            self.loaded_bytes -= self.loaded_sizes.pop(uid)
+
+            # Unload all keys sharing the execution model, otherwise memory
+            # is not released. Replace the model with an unloaded copy, since
+            # the loaded one still could be used for the ongoing predictions.
+            for key in keys:
+                m = self.models.get(key)
+                if m is not None:
+                    self.logger.info("Unloading %s model", m)
+                    m = m.copy()
+                    m.model = None
+                    self.models[key] = m
+
     async def unsafe_load(self, name: str, tag: str) -> Model:
         """Load the model into the internal cache without acquiring a lock."""
         key = (name, tag)
         if ((key not in self.models) or not self.models[key].loaded):
-            self.models[key] = await self.storage.load(name, tag)
+            self.put(await self.storage.load(name, tag))
         return self.models[key]
 
     async def load(self, name: str, tag: str) -> Model:
+        key = (name, tag)
+
+        # Most of the time the model is already loaded, so return it
+        # without waiting for any lock.
+        m = self.models.get(key)
+        if m is not None and m.loaded:
+            if id(m.model) in self.loaded_models:
+                self.loaded_models.move_to_end(id(m.model))
+            return m
+
         # Load the model from the parent storage when
         # it is missing in the cache.
-        async with self.lock.writer_lock:
+        async with self.lock_for(name, tag):
             return await self.unsafe_load(name, tag)
 
+    async def predict(self, m: Model, x) -> numpy.ndarray:
+        """Calculate predictions of the model.
+
+        Concurrent predictions of the same model are batched together.
+        """
+        return await self.batcher.predict(m, x)
+
     async def export(self, name: str, tag: str, writer: io.IOBase) -> None:
         return await self.storage.export(name, tag, writer)
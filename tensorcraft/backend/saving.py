@@ -1,12 +1,14 @@
 import aiorwlock
 import asyncio
 import concurrent.futures
+import functools
 import io
 import logging
 import operator
 import pathlib
 import tinydb
 import uuid
+import weakref
 
 import tensorcraft.logging
 
@@ -118,6 +120,11 @@ class FsModelsStorage(model.AbstractStorage):
         self.models_path.mkdir(parents=True, exist_ok=True)
         self.executor = concurrent.futures.ThreadPoolExecutor()
 
+        # The same model data could be addressed by multiple tags, these
+        # containers are used to load such models only once.
+        self.loaded_models = weakref.WeakValueDictionary()
+        self.loading_models = {}
+
         return self
 
     async def close(self) -> None:
@@ -263,10 +270,47 @@ class FsModelsStorage(model.AbstractStorage):
             raise errors.NotFoundError(name, tag)
         return self.build_model_from_document(document)
 
+    async def load_shared(self, m: model.Model) -> model.Model:
+        """Load the model, or reuse the model with the same identifier.
+
+        Concurrent calls for the same model wait for the single load, calls
+        for the model that is already loaded return it immediately.
+        """
+        loaded = self.loaded_models.get(m.id)
+        if loaded is not None:
+            return loaded
+
+        future = self.loading_models.get(m.id)
+        if future is None:
+            coro = self.await_in_thread(asyncio.coroutine(m.load)())
+            future = asyncio.ensure_future(coro)
+            future.add_done_callback(functools.partial(self.on_load, m.id))
+            self.loading_models[m.id] = future
+
+        # The load is shielded, so it will be completed even when all
+        # callers are cancelled (e.g. on client disconnect).
+        return await asyncio.shield(future)
+
+    def on_load(self, uid: uuid.UUID, future: asyncio.Future) -> None:
+        """Move the completed load from pending to loaded models."""
+        self.loading_models.pop(uid, None)
+
+        if not future.cancelled() and future.exception() is None:
+            self.loaded_models[uid] = future.result()
+
     async def load(self, name: str, tag: str) -> model.Model:
         """Load model with the given name and tag."""
         m = await self.load_from_meta(name, tag)
-        return await self.await_in_thread(asyncio.coroutine(m.load)())
+        loaded = await self.load_shared(m)
+
+        if loaded.tag == m.tag:
+            return loaded
+
+        # The model is loaded under a different tag (e.g. "latest"), so
+        # share the execution model, but preserve the requested tag.
+        shared = loaded.copy()
+        shared.tag = m.tag
+        return shared
 
     async def export(self, name: str, tag: str, writer: io.IOBase) -> None:
         """Export serialized model.
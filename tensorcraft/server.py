@@ -27,6 +27,7 @@ class Server:
     async def new(cls, data_root: str, pidfile: str,
                   host: str = None, port: str = None,
                   preload: bool = False,
+                  cache_size: int = None,
                   close_timeout: int = 10,
                   strategy: str = model.Strategy.No.value,
                   logger: logging.Logger = internal_logger):
@@ -46,7 +47,8 @@ class Server:
         loader = model.Loader(strategy=strategy, logger=logger)
 
         storage = saving.FsModelsStorage.new(path=data_root, loader=loader)
-        models = await model.Cache.new(storage=storage, preload=preload)
+        models = await model.Cache.new(storage=storage, preload=preload,
+                                       max_bytes=cache_size)
 
         # Experiments storage based on regular file system.
         experiments = saving.FsExperimentsStorage.new(path=data_root)
@@ -55,9 +57,11 @@ class Server:
 
         self.app.on_startup.append(cls.app_callback(self.pid.create))
         self.app.on_response_prepare.append(self._prepare_response)
+        self.app.on_shutdown.append(cls.app_callback(models.close))
         self.app.on_shutdown.append(cls.app_callback(storage.close))
         self.app.on_shutdown.append(cls.app_callback(experiments.close))
         self.app.on_shutdown.append(cls.app_callback(self.pid.close))
+        self.app.on_cleanup.append(cls.app_callback(loader.close))
 
         route = partial(route_to, api_version=tensorcraft.__apiversion__)
 
@@ -9,7 +9,6 @@ import yaml
 import tensorcraft.errors
 
 from tensorcraft import asynclib
-from tensorcraft import client
 from tensorcraft.shell import termlib
 
 
@@ -18,6 +17,12 @@ class AsyncSubCommand(flagparse.SubCommand):
     async def async_handle(self, args: flagparse.Namespace) -> None:
         pass
 
+    async def new_models_client(self, args: flagparse.Namespace):
+        # Import the client only when the command is executed, since its
+        # dependencies notably slow down the start of the shell.
+        client = importlib.import_module("tensorcraft.client")
+        return await client.Model.new(**args.__dict__)
+
     def handle(self, args: flagparse.Namespace) -> None:
         asynclib.run(self.async_handle(args))
 
@@ -56,7 +61,12 @@ class Server(flagparse.SubCommand):
         (["--preload"],
          dict(action="store_true",
               default=False,
-              help="preload all models into the memory before start"))]
+              help="preload all models into the memory before start")),
+        (["--cache-size"],
+         dict(metavar="SIZE",
+              type=int,
+              default=None,
+              help="maximum size of loaded models in bytes"))]
 
     def handle(self, args: flagparse.Namespace) -> None:
         try:
@@ -106,7 +116,7 @@ class Push(AsyncSubCommand):
             asyncreader = asynclib.reader(args.path)
             reader = termlib.async_progress(args.path, asyncreader)
 
-            models_client = await client.Model.new(**args.__dict__)
+            models_client = await self.new_models_client(args)
             async with models_client as models:
                 await models.push(args.name, args.tag, reader)
         except Exception as e:
@@ -137,7 +147,7 @@ class Remove(AsyncSubCommand):
 
     async def async_handle(self, args: flagparse.Namespace) -> None:
         try:
-            models_client = await client.Model.new(**args.__dict__)
+            models_client = await self.new_models_client(args)
             async with models_client as models:
                 await models.remove(args.name, args.tag)
         except tensorcraft.errors.NotFoundError as e:
@@ -160,7 +170,7 @@ class List(AsyncSubCommand):
 
     async def async_handle(self, args: flagparse.Namespace) -> None:
         try:
-            models_client = await client.Model.new(**args.__dict__)
+            models_client = await self.new_models_client(args)
             async with models_client as models:
                 for model in await models.list():
                     print("{name}:{tag}".format(**model))
@@ -199,7 +209,7 @@ class Export(AsyncSubCommand):
     async def async_handle(self, args: flagparse.Namespace) -> None:
         try:
             async with aiofiles.open(args.path, "wb+") as writer:
-                models_client = await client.Model.new(**args.__dict__)
+                models_client = await self.new_models_client(args)
                 async with models_client as models:
                     await models.export(args.name, args.tag, writer)
         except Exception as e:
@@ -219,7 +229,7 @@ class Status(AsyncSubCommand):
 
     async def async_handle(self, args: flagparse.Namespace) -> None:
         try:
-            models_client = await client.Model.new(**args.__dict__)
+            models_client = await self.new_models_client(args)
             async with models_client as models:
                 status = await models.status()
                 print(yaml.dump(status), end="")
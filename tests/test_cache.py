@@ -1,7 +1,10 @@
+import asyncio
+import threading
 import unittest
 import unittest.mock
 
-from tensorcraft.backend.model import Cache, AbstractStorage
+from tensorcraft import errors
+from tensorcraft.backend.model import Batcher, Cache, AbstractStorage, Model
 from tests import asynctest
 from tests import kerastest
 
@@ -30,6 +33,39 @@ class TestCache(asynctest.AsyncTestCase):
         # Ensure all returned models are loaded.
         self.assertTrue(all(map(lambda m: m.loaded, models)))
 
+    @asynctest.unittest_run_loop
+    async def test_all_cached(self):
+        m1 = kerastest.new_model()
+        m2 = m1.copy()
+
+        self.storage.all = asynctest.AsyncGeneratorMock(return_value=[m2])
+        cache = await Cache.new(storage=self.storage)
+        cache.models[m1.key] = m1
+
+        # The cached instance must be returned with its memoized dictionary.
+        d = m1.to_dict()
+        models = [m async for m in cache.all()]
+
+        self.assertIs(models[0], m1)
+        self.assertIs(models[0].to_dict(), d)
+
+    def test_to_dict(self):
+        m1 = kerastest.new_model()
+        d1 = m1.to_dict()
+
+        self.assertIs(d1, m1.to_dict())
+
+        # Copy shares the representation until its fields are changed.
+        m2 = m1.copy()
+        self.assertIs(d1, m2.to_dict())
+
+        m2.tag = "latest"
+        d2 = m2.to_dict()
+
+        self.assertEqual(d2["tag"], "latest")
+        self.assertEqual(d1["tag"], m1.tag)
+        self.assertEqual(d1["id"], d2["id"])
+
     @asynctest.unittest_run_loop
     async def test_save(self):
         m1 = kerastest.new_model()
@@ -85,6 +121,122 @@ class TestCache(asynctest.AsyncTestCase):
         self.assertIn(m1.key, cache.models)
         self.assertEqual(m1, m2)
 
+    @asynctest.unittest_run_loop
+    async def test_load_concurrent(self):
+        m1 = kerastest.new_model()
+        m2 = kerastest.new_model()
+
+        cache = await Cache.new(storage=self.storage)
+
+        # Ensure models are guarded by different locks.
+        while cache.lock_for(*m2.key) is cache.lock_for(*m1.key):
+            m2 = kerastest.new_model()
+
+        loaded = asyncio.Event()
+
+        async def load(name, tag):
+            if (name, tag) == m1.key:
+                await loaded.wait()
+                return m1
+            loaded.set()
+            return m2
+
+        self.storage.load = load
+
+        # Loading of the first model must not block the second one.
+        task = asyncio.ensure_future(cache.load(m1.name, m1.tag))
+        m = await asyncio.wait_for(cache.load(m2.name, m2.tag), timeout=1)
+
+        self.assertEqual(m2, m)
+        self.assertEqual(m1, await task)
+
+    @asynctest.unittest_run_loop
+    async def test_load_evict(self):
+        m1 = kerastest.new_model()
+        m1.model = unittest.mock.MagicMock()
+        m2 = kerastest.new_model()
+        m2.model = unittest.mock.MagicMock()
+
+        self.storage.load = asynctest.AsyncMagicMock(side_effect=[m1, m2])
+
+        nbytes = unittest.mock.PropertyMock(return_value=10)
+        with unittest.mock.patch.object(Model, "nbytes", new=nbytes):
+            cache = await Cache.new(storage=self.storage, max_bytes=15)
+            await cache.load(m1.name, m1.tag)
+            await cache.load(m2.name, m2.tag)
+
+        # Least recently used model must be unloaded, but still be known.
+        self.assertIn(m1.key, cache.models)
+        self.assertFalse(cache.models[m1.key].loaded)
+        self.assertTrue(cache.models[m2.key].loaded)
+        self.assertEqual(cache.loaded_bytes, 10)
+
+        # The evicted model could be still used by the ongoing calls.
+        self.assertTrue(m1.loaded)
+
+    @asynctest.unittest_run_loop
+    async def test_load_evict_shared(self):
+        m1 = kerastest.new_model()
+        m1.model = unittest.mock.MagicMock()
+        m2 = kerastest.new_model()
+        m2.model = unittest.mock.MagicMock()
+
+        # The latest tag shares the execution model with the original one.
+        latest = m1.copy()
+        latest.tag = "latest"
+
+        nbytes = unittest.mock.PropertyMock(return_value=10)
+        with unittest.mock.patch.object(Model, "nbytes", new=nbytes):
+            cache = await Cache.new(storage=self.storage, max_bytes=25)
+            await cache.save_to_cache(m1)
+            await cache.save_to_cache(latest)
+
+            # Shared execution model is accounted only once.
+            self.assertEqual(cache.loaded_bytes, 10)
+
+            cache.max_bytes = 15
+            await cache.save_to_cache(m2)
+
+        # Both keys of the shared model must be unloaded together.
+        self.assertFalse(cache.models[m1.key].loaded)
+        self.assertFalse(cache.models[latest.key].loaded)
+        self.assertTrue(cache.models[m2.key].loaded)
+        self.assertEqual(cache.loaded_bytes, 10)
+
+    @asynctest.unittest_run_loop
+    async def test_predict_batch(self):
+        m = kerastest.new_model()
+        m.model = unittest.mock.MagicMock()
+        m.model.side_effect = lambda x, training: x * 2
+
+        cache = await Cache.new(storage=self.storage)
+
+        y1, y2 = await asyncio.gather(cache.predict(m, [[1.0]]),
+                                      cache.predict(m, [[2.0], [3.0]]))
+        await cache.close()
+
+        # Both predictions must be calculated with a single call.
+        m.model.assert_called_once()
+        self.assertEqual(y1.tolist(), [[2.0]])
+        self.assertEqual(y2.tolist(), [[4.0], [6.0]])
+
+    @asynctest.unittest_run_loop
+    async def test_predict_invalid_shape(self):
+        m = kerastest.new_model()
+        m.model = unittest.mock.MagicMock()
+        m._expected_dims = (1,)
+
+        cache = await Cache.new(storage=self.storage)
+
+        with self.assertRaises(errors.InputShapeError) as cm:
+            await cache.predict(m, [[1.0, 2.0]])
+
+        self.assertEqual(cm.exception.expected_dims, (1,))
+        self.assertEqual(cm.exception.actual_dims, (2,))
+
+        with self.assertRaises(ValueError):
+            await cache.predict(m, 1.0)
+
     @asynctest.unittest_run_loop
     async def test_load_not_found(self):
         m1 = kerastest.new_model()
@@ -100,5 +252,46 @@ class TestCache(asynctest.AsyncTestCase):
         self.assertEqual(m1, m2)
 
 
+
+class TestBatcher(asynctest.AsyncTestCase):
+
+    @asynctest.unittest_run_loop
+    async def test_predict_idle(self):
+        m = kerastest.new_model()
+        m.model = unittest.mock.MagicMock()
+        m.model.side_effect = lambda x, training: x
+
+        batcher = Batcher(idle_timeout=0.01)
+        await batcher.predict(m, [[1.0]])
+        await asyncio.sleep(0.1)
+
+        # Idle worker must stop and release the queue of the model.
+        self.assertEqual(batcher.workers, {})
+        self.assertEqual(batcher.queues, {})
+
+    @asynctest.unittest_run_loop
+    async def test_close(self):
+        predicted = threading.Event()
+
+        def predict(x, training):
+            predicted.wait(timeout=5)
+            return x
+
+        m = kerastest.new_model()
+        m.model = unittest.mock.MagicMock(side_effect=predict)
+
+        batcher = Batcher()
+        task = asyncio.ensure_future(batcher.predict(m, [[1.0]]))
+        await asyncio.sleep(0.1)
+
+        # Close must not hang while the prediction is in progress.
+        await asyncio.wait_for(batcher.close(), timeout=1)
+        predicted.set()
+
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertEqual(batcher.workers, {})
+
+
 if __name__ == "__main__":
     unittest.main()
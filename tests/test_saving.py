@@ -1,7 +1,11 @@
 import aiofiles
+import asyncio
+import concurrent.futures
 import io
 import pathlib
+import tensorflow as tf
 import tempfile
+import threading
 import unittest
 import unittest.mock
 
@@ -36,6 +40,78 @@ class TestModelRuntime(asynctest.AsyncTestCase):
         self.assertEqual(d1["id"], d2["id"])
         self.assertTrue(m.loaded)
 
+    @asynctest.unittest_run_loop
+    async def test_load_shared(self):
+        loader = model.Loader("no")
+        fs = saving.FsModelsStorage.new(path=self.workpath, loader=loader)
+
+        async with kerastest.crossentropy_model_tar("n", "t") as tarpath:
+            async with aiofiles.open(tarpath, "rb") as model_tar:
+                stream = io.BytesIO(await model_tar.read())
+                await fs.save("n", "t", stream)
+
+        m1 = await fs.load("n", "t")
+        m2 = await fs.load("n", "latest")
+
+        # Both tags reference the same model, so it is loaded only once.
+        self.assertEqual(m1.id, m2.id)
+        self.assertEqual("latest", m2.tag)
+        self.assertIs(m1.model, m2.model)
+
+    @asynctest.unittest_run_loop
+    async def test_load_shared_cancelled(self):
+        loader = model.Loader("no")
+        fs = saving.FsModelsStorage.new(path=self.workpath, loader=loader)
+
+        m = kerastest.new_model()
+        loaded = threading.Event()
+
+        def load(self):
+            loaded.wait(timeout=5)
+            return self
+
+        with unittest.mock.patch.object(model.Model, "load",
+                                        autospec=True,
+                                        side_effect=load) as load_mock:
+            task = asyncio.ensure_future(fs.load_shared(m))
+            await asyncio.sleep(0)
+
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+            # Cancelled caller must not abort the load, so the next caller
+            # waits for the same load instead of starting a new one.
+            self.assertIn(m.id, fs.loading_models)
+
+            loaded.set()
+            self.assertIs(m, await fs.load_shared(m))
+
+        load_mock.assert_called_once()
+        self.assertNotIn(m.id, fs.loading_models)
+
+
+class TestLoader(unittest.TestCase):
+
+    def test_load_concurrent(self):
+        loader = model.Loader("no")
+        barrier = threading.Barrier(2, timeout=5)
+
+        # Both loads must wait for each other, which is possible only when
+        # models are loaded concurrently.
+        def load_from_saved_model(path):
+            barrier.wait()
+            return path
+
+        with unittest.mock.patch.object(tf.keras.experimental,
+                                        "load_from_saved_model",
+                                        new=load_from_saved_model):
+            with concurrent.futures.ThreadPoolExecutor() as executor:
+                results = list(executor.map(loader.load, ["a", "b"]))
+
+        loader.close()
+        self.assertEqual(results, ["a", "b"])
+
 
 if __name__ == "__main__":
     unittest.main()
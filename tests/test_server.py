@@ -1,6 +1,7 @@
 import aiofiles
 import aiohttp.test_utils as aiohttptest
 import aiohttp.web
+import numpy
 import pathlib
 import tempfile
 import unittest
@@ -71,6 +72,72 @@ class TestServer(aiohttptest.AioHTTPTestCase):
             resp = await self.client.post(m.url+"/predict", json=data)
             self.assertEqual(resp.status, 200)
 
+    @aiohttptest.unittest_run_loop
+    async def test_predict_invalid_shape(self):
+        async with self.pushed_model() as m:
+            data = dict(x=[[1.0, 2.0]])
+            resp = await self.client.post(m.url+"/predict", json=data)
+            self.assertEqual(resp.status, 400)
+
+    @aiohttptest.unittest_run_loop
+    async def test_predict_octet_stream(self):
+        async with self.pushed_model() as m:
+            for dtype in ["float32", "float64"]:
+                data = numpy.array([[1.0], [2.0]], dtype=dtype)
+                headers = {"Content-Type": "application/octet-stream",
+                           "Input-Shape": "2,1",
+                           "Input-Dtype": dtype}
+
+                resp = await self.client.post(m.url+"/predict",
+                                              data=data.tobytes(),
+                                              headers=headers)
+                self.assertEqual(resp.status, 200)
+
+                data = await resp.json()
+                self.assertEqual(2, len(data["y"]))
+
+    @aiohttptest.unittest_run_loop
+    async def test_predict_accept_octet_stream(self):
+        async with self.pushed_model() as m:
+            data = dict(x=[[1.0], [2.0]])
+            headers = {"Accept": "application/octet-stream"}
+
+            resp = await self.client.post(m.url+"/predict",
+                                          json=data,
+                                          headers=headers)
+            self.assertEqual(resp.status, 200)
+
+            shape = resp.headers["Output-Shape"]
+            dtype = resp.headers["Output-Dtype"]
+
+            y = numpy.frombuffer(await resp.read(), dtype=dtype)
+            self.assertEqual(y.reshape([2, 1]).shape, (2, 1))
+            self.assertEqual(shape, "2,1")
+
+    @aiohttptest.unittest_run_loop
+    async def test_predict_octet_stream_no_shape(self):
+        async with self.pushed_model() as m:
+            data = numpy.array([[1.0]], dtype=numpy.float32)
+            headers = {"Content-Type": "application/octet-stream",
+                       "Input-Dtype": "float32"}
+
+            resp = await self.client.post(m.url+"/predict",
+                                          data=data.tobytes(),
+                                          headers=headers)
+            self.assertEqual(resp.status, 400)
+
+    @aiohttptest.unittest_run_loop
+    async def test_predict_octet_stream_no_dtype(self):
+        async with self.pushed_model() as m:
+            data = numpy.array([[1.0]], dtype=numpy.float32)
+            headers = {"Content-Type": "application/octet-stream",
+                       "Input-Shape": "1,1"}
+
+            resp = await self.client.post(m.url+"/predict",
+                                          data=data.tobytes(),
+                                          headers=headers)
+            self.assertEqual(resp.status, 400)
+
     @aiohttptest.unittest_run_loop
     async def test_predict_not_found(self):
         data = dict(x=[[1.0]])